@@ -1,4 +1,5 @@
 import pandas as pd
+from sim.results_catalog import ResultsCatalog
 from sim.simsetup import *
 
 # Define constants for column names
@@ -22,7 +23,7 @@ class CounterfactualAnalysis:
         # (skeptic has advantage). Negative value means AABM has lower (better) score.
         df1[SKEPTIC_BRIER_ADVANTAGE_KEY] = (df1['sims_av_brier_ratio'] - 0.25)
         df1[COUNTERFACTUAL_BRIER_RATIO_KEY] = (
-            ((df1['scientist_init_popcount'] - 1) * df1['sims_av_brier_ratio'] + 0.25) / df1['scientist_init_popcount']
+            ((df1['pop_size'] - 1) * df1['sims_av_brier_ratio'] + 0.25) / df1['pop_size']
         )
         df1[COUNTERFACTUAL_DIFF_KEY] = (
             df1[COUNTERFACTUAL_BRIER_RATIO_KEY] - df1['sims_av_brier_ratio']
@@ -87,21 +88,18 @@ class CounterfactualAnalysis:
                                      
         df2 = df2.round(4)
         output_filename = output_basename.replace('.csv', '_w_counterfactual.csv')
-        df2.to_csv(output_filename, index=False)
+        df2.to_csv(output_filename, index=False, na_rep='N/A')
 
 if __name__ == '__main__':
     ca = CounterfactualAnalysis()
-    df1 = pd.read_csv(LIFECYCLE_FILENAME)
-    df2_name = LIFECYCLE_W_SKEPTICS_FILENAME
-    df3_name = LIFECYCLE_W_ALTERNATOR_SKEPTICS_FILENAME
-    df2 = pd.read_csv(df2_name)
-    df3 = pd.read_csv(df3_name)
-    ca.analyze_credence_spiking_vs_didactic(df1, df2, df2_name)
-    ca.analyze_credence_spiking_vs_didactic(df1, df3, df3_name)
+    catalog = ResultsCatalog()
+    df1 = catalog.get(ENSimType.LIFECYCLE)
+    df2 = catalog.get(ENSimType.LIFECYCLE_W_SKEPTIC)
+    df3 = catalog.get(ENSimType.LIFECYCLE_W_ALTERNATOR_SKEPTIC)
+    ca.analyze_credence_spiking_vs_didactic(df1, df2, catalog.path(ENSimType.LIFECYCLE_W_SKEPTIC))
+    ca.analyze_credence_spiking_vs_didactic(df1, df3, catalog.path(ENSimType.LIFECYCLE_W_ALTERNATOR_SKEPTIC))
 
     # Propagandist and centrist
-    df4_name = LIFECYCLE_W_PROPAGANDIST_FILENAME
-    df5_name = LIFECYCLE_W_PROPAGANDIST_N_SKEPTIC_FILENAME
-    df4 = pd.read_csv(df4_name)
-    df5 = pd.read_csv(df5_name)
-    ca.analyze_credence_spiking_vs_didactic(df4, df5, df5_name) 
+    df4 = catalog.get(ENSimType.LIFECYCLE_W_PROPAGANDIST)
+    df5 = catalog.get(ENSimType.LIFECYCLE_W_PROPAGANDIST_N_SKEPTIC)
+    ca.analyze_credence_spiking_vs_didactic(df4, df5, catalog.path(ENSimType.LIFECYCLE_W_PROPAGANDIST_N_SKEPTIC)) 
@@ -1,56 +1,64 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 
+from sim.results_catalog import ResultsCatalog
 from sim.simsetup import *
 
-df1 = pd.read_csv(LIFECYCLE_FILENAME)
-df2 = pd.read_csv(LIFECYCLE_W_SKEPTICS_FILENAME)
-df3 = pd.read_csv(LIFECYCLE_W_ALTERNATOR_SKEPTICS_FILENAME)
-df4 = pd.read_csv(LIFECYCLE_W_PROPAGANDIST_FILENAME)
-df5 = pd.read_csv(LIFECYCLE_W_PROPAGANDIST_N_SKEPTIC_FILENAME)
-
-def plot_brier_ratio(scientist_init_popcount, epsilon, df1, df2, df3,
-                     df2_label, df3_label, title):
-    # Load the CSV files
-    # Filter the data
-    df1_filtered = df1[(df1['scientist_init_popcount'] == scientist_init_popcount) & (df1['epsilon'] == epsilon)]
-    df2_filtered = df2[(df2['scientist_init_popcount'] == scientist_init_popcount) & (df2['epsilon'] == epsilon)]
-    df3_filtered = df3[(df3['scientist_init_popcount'] == scientist_init_popcount) & (df3['epsilon'] == epsilon)]
-
-    # Plot the data
-    plt.figure(figsize=(10, 6))
-    plt.plot(df1_filtered['m'], df1_filtered['sims_av_brier_ratio'], label='Baseline', marker='o')
-    plt.plot(df2_filtered['m'], df2_filtered['sims_av_brier_ratio'], label=df2_label, marker='s')
-    plt.plot(df3_filtered['m'], df3_filtered['sims_av_brier_ratio'], label=df3_label, marker='v')
+MARKERS = ['o', 's', 'v', '^', 'D']
 
-    # Add labels and title
-    plt.xlabel('m (distrust multiplier)')
-    plt.ylabel('Simulation Brier ratio')
+def plot_brier_ratio(catalog: ResultsCatalog, pop_size, epsilon, sim_types, labels, title):
+    plt.figure(figsize=(10, 6))
+    _plot_brier_ratio_panel(plt.gca(), catalog, pop_size, epsilon, sim_types, labels)
     plt.title(title)
-    plt.legend()
-    plt.grid(True)
     plt.show()
 
-epsilons = [0.01, 0.05, 0.1]
-# plot_brier_ratio(10, 0.01)
-# plot_brier_ratio(10, 0.05)
-#plot_brier_ratio(10, 0.1, df1, df2, df3)
-# plot_brier_ratio(20, 0.01)
-# plot_brier_ratio(20, 0.05)
-# plot_brier_ratio(20, 0.1)
-# plot_brier_ratio(50, 0.01)
-# plot_brier_ratio(50, 0.05)
-# plot_brier_ratio(50, 0.1)
-
-#Propagandist
-# plot_brier_ratio(10, 0.01, df1, df4, df5, 'With propagandist', 'With propagandist and centrist',
-#                  'Propagandist and centrist')
-# plot_brier_ratio(20, 0.01, df1, df4, df5, 'With propagandist', 'With propagandist and centrist',
-#                  'Propagandist and centrist') # Centrist only slightly helps against propagandist (credence spikign only?)
-# plot_brier_ratio(20, 0.05, df1, df4, df5, 'With propagandist', 'With propagandist and centrist',
-#                  'Propagandist and centrist') # Centrist balances out propagandist
-# plot_brier_ratio(20, 0.1, df1, df4, df5, 'With propagandist', 'With propagandist and centrist',
-#                  'Propagandist and centrist') # Propagandist and centrist outperforms baseline
-
-plot_brier_ratio(20, 0.1, df1, df2, df5, 'Centrist', 'With propagandist and centrist',
-                 'Propagandist and centrist')
\ No newline at end of file
+def plot_brier_ratio_grid(catalog: ResultsCatalog, sim_types, labels, title,
+                          pop_sizes=pop_VALS, epsilons=e_VALS):
+    """ Batch mode: render the panels for every (pop_size, epsilon) pair in one figure,
+    one row per pop_size and one column per epsilon. """
+    fig, axes = plt.subplots(len(pop_sizes), len(epsilons), squeeze=False,
+                             figsize=(5 * len(epsilons), 4 * len(pop_sizes)))
+    for row, pop_size in enumerate(pop_sizes):
+        for col, epsilon in enumerate(epsilons):
+            ax = axes[row][col]
+            _plot_brier_ratio_panel(ax, catalog, pop_size, epsilon, sim_types, labels)
+            ax.set_title(f'pop_size = {pop_size}, epsilon = {epsilon}')
+    fig.suptitle(title)
+    fig.tight_layout()
+    plt.show()
+
+def _plot_brier_ratio_panel(ax, catalog: ResultsCatalog, pop_size, epsilon, sim_types, labels):
+    for sim_type, label, marker in zip(sim_types, labels, MARKERS):
+        df = catalog.get(sim_type, pop_size=pop_size, epsilon=epsilon)
+        ax.plot(df['m'], df['sims_av_brier_ratio'], label=label, marker=marker)
+
+    # Add labels
+    ax.set_xlabel('m (distrust multiplier)')
+    ax.set_ylabel('Simulation Brier ratio')
+    ax.legend()
+    ax.grid(True)
+
+if __name__ == '__main__':
+    catalog = ResultsCatalog()
+
+    # Skeptic and alternator skeptic
+    # plot_brier_ratio_grid(catalog,
+    #                       [ENSimType.LIFECYCLE, ENSimType.LIFECYCLE_W_SKEPTIC, ENSimType.LIFECYCLE_W_ALTERNATOR_SKEPTIC],
+    #                       ['Baseline', 'With skeptic', 'With alternator skeptic'],
+    #                       'Skeptic and alternator skeptic')
+    # plot_brier_ratio(catalog, 10, 0.1,
+    #                  [ENSimType.LIFECYCLE, ENSimType.LIFECYCLE_W_SKEPTIC, ENSimType.LIFECYCLE_W_ALTERNATOR_SKEPTIC],
+    #                  ['Baseline', 'With skeptic', 'With alternator skeptic'],
+    #                  'Skeptic and alternator skeptic')
+
+    #Propagandist
+    # plot_brier_ratio_grid(catalog,
+    #                       [ENSimType.LIFECYCLE, ENSimType.LIFECYCLE_W_PROPAGANDIST, ENSimType.LIFECYCLE_W_PROPAGANDIST_N_SKEPTIC],
+    #                       ['Baseline', 'With propagandist', 'With propagandist and centrist'],
+    #                       'Propagandist and centrist')
+    # At pop 20: centrist only slightly helps against propagandist at epsilon 0.01 (credence spiking only?),
+    # balances out propagandist at 0.05, and propagandist and centrist outperforms baseline at 0.1
+
+    plot_brier_ratio(catalog, 20, 0.1,
+                     [ENSimType.LIFECYCLE, ENSimType.LIFECYCLE_W_SKEPTIC, ENSimType.LIFECYCLE_W_PROPAGANDIST_N_SKEPTIC],
+                     ['Baseline', 'Centrist', 'With propagandist and centrist'],
+                     'Propagandist and centrist')
@@ -0,0 +1,63 @@
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from enum import Enum, auto
+from multiprocessing import Pool, cpu_count
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+class ExecutorType(Enum):
+    PROCESS = auto()
+    # One process per worker. Sidesteps the GIL, but pays for process startup, pickling
+    # tasks and results, and duplicated memory
+    THREAD = auto()
+    # Threads in the current process share read-only per-config precomputation. Only
+    # worthwhile when the sim's hot loops release the GIL (NumPy kernels, or a
+    # free-threaded CPython build)
+    SERIAL = auto()
+    # Runs sims one after another in the current process. Useful for debugging with breakpoints
+
+class ENSimExecutor(ABC):
+    """ Runs a function over a list of tasks, yielding results as they complete (in no
+    particular order). """
+    def __init__(self, worker_count: Optional[int] = None):
+        self.worker_count = worker_count if worker_count else max(cpu_count() - 1, 1)
+
+    @abstractmethod
+    def map_unordered(self, fn: Callable[[T], R], tasks: Iterable[T]) -> Iterator[R]:
+        ...
+
+class ProcessExecutor(ENSimExecutor):
+    def map_unordered(self, fn: Callable[[T], R], tasks: Iterable[T]) -> Iterator[R]:
+        # Leaving the block terminates the pool, so that an interrupt or an exception raised
+        # while results are being consumed does not wait on workers that will never finish
+        with Pool(processes=self.worker_count) as pool:
+            for result in pool.imap_unordered(fn, tasks):
+                yield result
+
+class ThreadExecutor(ENSimExecutor):
+    def map_unordered(self, fn: Callable[[T], R], tasks: Iterable[T]) -> Iterator[R]:
+        with ThreadPoolExecutor(max_workers=self.worker_count) as pool:
+            futures = [pool.submit(fn, task) for task in tasks]
+            for future in as_completed(futures):
+                yield future.result()
+
+class SerialExecutor(ENSimExecutor):
+    def __init__(self, worker_count: Optional[int] = None):
+        super().__init__(1)
+
+    def map_unordered(self, fn: Callable[[T], R], tasks: Iterable[T]) -> Iterator[R]:
+        for task in tasks:
+            yield fn(task)
+
+def make_executor(executor_type: ExecutorType, worker_count: Optional[int] = None) -> ENSimExecutor:
+    match executor_type:
+        case ExecutorType.PROCESS:
+            return ProcessExecutor(worker_count)
+        case ExecutorType.THREAD:
+            return ThreadExecutor(worker_count)
+        case ExecutorType.SERIAL:
+            return SerialExecutor(worker_count)
+        case _:
+            raise ValueError(f"Unknown executor type: {executor_type}")
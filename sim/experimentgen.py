@@ -13,3 +13,6 @@ class ExperimentGen:
     def experiment(self, n: int, epsilon):
         k = self.rng.binomial(n, 0.5 + epsilon)
         return BinomialExperiment(k, n)
+
+    def coin_flip(self) -> bool:
+        return bool(self.rng.integers(2))
@@ -0,0 +1,219 @@
+import numpy as np
+from typing import NamedTuple, Optional, List
+from enum import Enum, auto
+
+from sim.simsetup import *
+
+BRIER_RATIO_KEY = 'sims_av_brier_ratio'
+
+INT_PARAMS = [field for field, field_type in ENParams.__annotations__.items() if field_type is int]
+# Sampled values for these params are rounded to the nearest integer
+NUMERIC_PARAMS = [field for field, field_type in ENParams.__annotations__.items() if field_type in (int, float)]
+# The params that can be explored over a range
+
+class ENDesign(Enum):
+    LATIN_HYPERCUBE = auto()
+    SOBOL = auto() # Requires scipy
+
+class ENExplorationPoint(NamedTuple):
+    params: ENParams
+    metrics: dict[str, float]
+    # The numeric fields of ENLifecycleAnalyzedResults. Fields that are "N/A" for the
+    # point (e.g. the non-skeptic brier ratio when there is no skeptic) are left out
+
+class ENExplorationResults(NamedTuple):
+    points: List[ENExplorationPoint]
+    surrogates: dict[str, 'GaussianProcess'] # One surrogate per metric
+
+## Designs
+def latin_hypercube(n: int, dims: int, rng: np.random.Generator) -> np.ndarray:
+    """ n points in the unit hypercube [0, 1)^dims such that, along every dimension, each of
+    the n equal-width strata contains exactly one point. """
+    strata = np.array([rng.permutation(n) for _ in range(dims)]).T
+    return (strata + rng.uniform(size=(n, dims))) / n
+
+def sobol(n: int, dims: int, rng: np.random.Generator) -> np.ndarray:
+    """ The first n points of a scrambled Sobol sequence. n should be a power of 2. """
+    try:
+        from scipy.stats import qmc
+    except ImportError as e:
+        raise ImportError("Sobol designs require scipy. Use ENDesign.LATIN_HYPERCUBE instead.") from e
+    return qmc.Sobol(d=dims, scramble=True, seed=rng).random(n)
+
+## Surrogate
+class GaussianProcess():
+    """ A minimal Gaussian process regressor with a squared exponential kernel, for inputs
+    scaled to the unit hypercube. The lengthscale and noise level are chosen from a small grid
+    by maximizing the log marginal likelihood. Outputs are standardized before fitting. """
+    LENGTHSCALES = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0)
+    NOISE_VARIANCES = (1e-4, 1e-3, 1e-2, 0.1, 0.3)
+
+    def __init__(self):
+        self.X: Optional[np.ndarray] = None
+        self.lengthscale = self.LENGTHSCALES[0]
+        self.noise_variance = self.NOISE_VARIANCES[0]
+
+    def fit(self, X: np.ndarray, y: np.ndarray) -> 'GaussianProcess':
+        self.X = X
+        self.y_mean = float(np.mean(y))
+        self.y_sd = float(np.std(y)) or 1.0
+        y_std = (y - self.y_mean) / self.y_sd
+        best = -np.inf
+        for lengthscale in self.LENGTHSCALES:
+            for noise_variance in self.NOISE_VARIANCES:
+                L, alpha = self._factorize(X, y_std, lengthscale, noise_variance)
+                log_likelihood = (-0.5 * y_std @ alpha - np.sum(np.log(np.diag(L)))
+                                  - 0.5 * len(y_std) * np.log(2 * np.pi))
+                if log_likelihood > best:
+                    best = log_likelihood
+                    self.lengthscale, self.noise_variance = lengthscale, noise_variance
+                    self._L, self._alpha = L, alpha
+        return self
+
+    def predict(self, X: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """ Posterior mean and standard deviation (of the underlying function, excluding
+        the noise of individual runs) at X. """
+        if self.X is None:
+            raise ValueError("The surrogate has to be fit before it can predict")
+        K_s = self._kernel(self.X, X, self.lengthscale)
+        mean = K_s.T @ self._alpha
+        v = np.linalg.solve(self._L, K_s)
+        var = np.clip(1 - np.sum(v ** 2, axis=0), 0, None)
+        return mean * self.y_sd + self.y_mean, np.sqrt(var) * self.y_sd
+
+    def _factorize(self, X: np.ndarray, y: np.ndarray, lengthscale: float, noise_variance: float):
+        K = self._kernel(X, X, lengthscale) + noise_variance * np.eye(len(X))
+        L = np.linalg.cholesky(K + 1e-10 * np.eye(len(X)))
+        alpha = np.linalg.solve(L.T, np.linalg.solve(L, y))
+        return L, alpha
+
+    def _kernel(self, A: np.ndarray, B: np.ndarray, lengthscale: float) -> np.ndarray:
+        sq_dists = np.sum((A[:, None, :] - B[None, :, :]) ** 2, axis=-1)
+        return np.exp(-0.5 * sq_dists / lengthscale ** 2)
+
+## Exploration
+class ENExploration():
+    """ Explore continuous ranges of ENParams fields instead of a dense grid. An initial
+    space-filling design is run with a modest sim_count per point, surrogates are fit to the
+    summary metrics, and further points are placed where the surrogate for target_metric is
+    most uncertain.
+
+    E.g. ENExploration(ENSimSetup(100, None), ENParams(pop_size=20, epsilon=0.05, m=1),
+                       {'m': (0, 3), 'epsilon': (0.01, 0.1)}).explore(16, 4, 4) """
+    def __init__(self,
+                 setup: ENSimSetup,
+                 base_params: ENParams,
+                 ranges: dict[str, tuple[float, float]],
+                 target_metric: str = BRIER_RATIO_KEY,
+                 output_filename: Optional[str] = None,
+                 seed: int = 253):
+        for field in ranges:
+            if field not in ENParams._fields:
+                raise ValueError(f"'{field}' is not an ENParams field")
+            if field not in NUMERIC_PARAMS:
+                raise ValueError(f"'{field}' is not a numeric ENParams field and cannot be explored over a range")
+        if target_metric not in ENLifecycleAnalyzedResults._fields:
+            raise ValueError(f"'{target_metric}' is not an ENLifecycleAnalyzedResults field")
+        if output_filename:
+            setup.output_processor.check_headers(output_filename)
+        self.setup = setup
+        self.base_params = base_params
+        self.fields = list(ranges)
+        self.lows = np.array([ranges[f][0] for f in self.fields], dtype=float)
+        self.highs = np.array([ranges[f][1] for f in self.fields], dtype=float)
+        self.target_metric = target_metric
+        self.output_filename = output_filename
+        self.rng = np.random.default_rng(seed)
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.points: List[ENExplorationPoint] = []
+        self._unit_points: List[np.ndarray] = []
+
+    ## Interface
+    def explore(self,
+                initial_count: int,
+                adaptive_rounds: int,
+                batch_size: int = 1,
+                design: ENDesign = ENDesign.LATIN_HYPERCUBE,
+                candidate_count: int = 1000) -> ENExplorationResults:
+        for unit_point in self._design(initial_count, design):
+            self.run_point(unit_point)
+        for _ in range(adaptive_rounds):
+            for unit_point in self.propose(batch_size, candidate_count):
+                self.run_point(unit_point)
+        return ENExplorationResults(self.points, self.fit_surrogates())
+
+    def run_point(self, unit_point: np.ndarray) -> ENExplorationPoint:
+        params = self.params_for(unit_point)
+        print(f'Exploring point {len(self.points) + 1}: {params}')
+        rng_streams = [np.random.default_rng(s) for s in self.seed_sequence.spawn(self.setup.sim_count)]
+        start_time = timeit.default_timer()
+        sims_summary = self.setup.run_sims_for_param_config(params, rng_streams)
+        time_elapsed = timeit.default_timer() - start_time
+        if self.output_filename:
+            csv_data = self.setup.output_processor.data_for_writing(sims_summary, self.setup.sim_count, time_elapsed)
+            self.setup.output_processor.record_sim(csv_data, self.output_filename)
+        metrics: dict[str, float] = {}
+        for field, value in sims_summary.results_summary._asdict().items():
+            try:
+                metrics[field] = float(value)
+            except ValueError:
+                pass # "N/A"
+        point = ENExplorationPoint(params, metrics)
+        self.points.append(point)
+        self._unit_points.append(self._to_unit(params))
+        return point
+
+    def fit_surrogates(self) -> dict[str, GaussianProcess]:
+        surrogates: dict[str, GaussianProcess] = {}
+        for metric in ENLifecycleAnalyzedResults._fields:
+            X, y = self._training_data(metric)
+            if len(y) >= 2:
+                surrogates[metric] = GaussianProcess().fit(X, y)
+        return surrogates
+
+    def propose(self, batch_size: int, candidate_count: int = 1000) -> List[np.ndarray]:
+        """ Greedily pick the candidates with the highest surrogate uncertainty for
+        target_metric. After each pick the surrogate is refit with its own prediction at the
+        picked point, which leaves the mean unchanged but shrinks the uncertainty around it,
+        so that a batch does not bunch up in one region. """
+        X, y = self._training_data(self.target_metric)
+        if len(y) < 2:
+            raise ValueError("Need at least two evaluated points to fit a surrogate")
+        candidates = latin_hypercube(candidate_count, len(self.fields), self.rng)
+        # Integer params can only take a few values, so snap candidates to what would be run
+        candidates = np.array([self._to_unit(self.params_for(c)) for c in candidates])
+        picks: List[np.ndarray] = []
+        for _ in range(batch_size):
+            surrogate = GaussianProcess().fit(X, y)
+            mean, sd = surrogate.predict(candidates)
+            best = int(np.argmax(sd))
+            picks.append(candidates[best])
+            X = np.vstack([X, candidates[best]])
+            y = np.append(y, mean[best])
+        return picks
+
+    def params_for(self, unit_point: np.ndarray) -> ENParams:
+        values = self.lows + unit_point * (self.highs - self.lows)
+        replacements = {}
+        for field, value in zip(self.fields, values):
+            replacements[field] = int(round(value)) if field in INT_PARAMS else float(value)
+        return self.base_params._replace(**replacements)
+
+    ## Private methods
+    def _design(self, n: int, design: ENDesign) -> np.ndarray:
+        match design:
+            case ENDesign.LATIN_HYPERCUBE:
+                return latin_hypercube(n, len(self.fields), self.rng)
+            case ENDesign.SOBOL:
+                return sobol(n, len(self.fields), self.rng)
+
+    def _to_unit(self, params: ENParams) -> np.ndarray:
+        values = np.array([getattr(params, f) for f in self.fields], dtype=float)
+        spans = np.where(self.highs > self.lows, self.highs - self.lows, 1)
+        return (values - self.lows) / spans
+
+    def _training_data(self, metric: str) -> tuple[np.ndarray, np.ndarray]:
+        rows = [(u, p.metrics[metric]) for u, p in zip(self._unit_points, self.points) if metric in p.metrics]
+        X = np.array([u for u, _ in rows]).reshape(len(rows), len(self.fields))
+        y = np.array([v for _, v in rows], dtype=float)
+        return X, y
@@ -1,14 +1,50 @@
-from sim.scientist import Scientist
+from sim.experimentgen import BinomialExperiment
+from sim.random_tape import RandomTape, TapeExperimentGen
+from sim.scientist import Scientist, likelihood_table
 from sim.sim_models import *
 import numpy as np
-from typing import List
+from typing import List, NamedTuple, Optional
+
+SYNCHRONOUS_MATRIX_MIN_SIZE = 400
+# With synchronous updates, rounds with at least this many (agent, publisher) pairs are
+# updated as a matrix operation. Below it, NumPy's per-call overhead outweighs the gain
+
+REPORTER_INDEX_MAX_SHARE = .5
+# With the reporter index, updaters only visit the publishers when at most this share of
+# the agents published. Otherwise every updater visits every influencer
+
+class ENetworkState(NamedTuple):
+    """ Everything needed to continue a network's run from the start of a round. Agents are
+    identified by their slot (position in ENetwork.scientists). """
+    rounds_played: int
+    credences: np.ndarray
+    rounds_of_experience: np.ndarray
+    is_skeptic: np.ndarray
+    is_propagandist: np.ndarray
+    influencer_orders: np.ndarray # Row i holds the slots of agent i's influencers, in update order
+    retiree_credences: tuple[float, ...]
+    rng_state: dict
 
 class ENetwork():
     def __init__(self,
                  rng: np.random.Generator,
-                 params: ENParams):
+                 params: ENParams,
+                 tape: Optional[RandomTape] = None,
+                 reporter_index: bool = True):
         self.rng = rng
         self.params = params
+        self.tape = tape
+        # If given, experiments, coin flips, retirements and entrant priors are read
+        # from the tape rather than drawn from rng
+        self.reporter_index = reporter_index
+        # If True, updaters only visit the influencers who published data this round (see
+        # _standard_round_actions). If False, every updater visits every influencer, as in the
+        # reference implementation. Both give identical results
+        self.credences_changed = True
+        # Whether any credence may have changed in the last round. Lets the sim's metrics
+        # skip recomputing round scores for rounds in which nothing happened
+        if tape:
+            tape.check_compatible(params)
         priors = params.init_priors_func(params.pop_size, rng)
         self._rounds_played = 0
         self.scientists = [Scientist(prior, params, rng, False) for prior in priors]
@@ -19,47 +55,174 @@ class ENetwork():
         for _ in range(params.skeptic_count):
             prior = .5
             non_skeptics = [s for s in self.scientists if not s.is_skeptic]
-            skeptic_to_become: Scientist = np.random.choice(non_skeptics)
+            skeptic_to_become: Scientist = non_skeptics[self.rng.integers(len(non_skeptics))]
             skeptic_to_become.__init__(prior, params, rng, True)
 
         if params.propagandist:
             # We only ever add one propagandist. We do not replace a skeptic if one is present
             prior = .5
             non_skeptics = [s for s in self.scientists if not s.is_skeptic]
-            propagandist_to_be: Scientist = np.random.choice(non_skeptics)
+            propagandist_to_be: Scientist = non_skeptics[self.rng.integers(len(non_skeptics))]
             propagandist_to_be.__init__(prior, params, rng, False, True)
             
-        for s in self.scientists:
+        for slot, s in enumerate(self.scientists):
             # We assume that the network we start off with has some experience
             s.rounds_of_experience = 20 
+            self._attach_tape(s, slot)
         self._structure_scientific_network(self.scientists)
         self.retiree_credences: list[float] = []
 
     ## Init helpers
     def _structure_scientific_network(self, scientists: List[Scientist]):
-        for scientist in scientists:
+        self.influencer_orders = np.empty((len(scientists), len(scientists)), dtype=np.int64)
+        for slot, scientist in enumerate(scientists):
             scientist.influencers = []
             indices = np.arange(len(scientists))
             self.rng.shuffle(indices)
+            self.influencer_orders[slot] = indices
             shuffled_influencers: list[Scientist] = []
             for i in indices:
                 shuffled_influencers.append(scientists[i])
             self._add_all_influencers_for_updater(scientist, shuffled_influencers)
+        self._index_influencers()
+
+    def _index_influencers(self):
+        # influencer_ranks[i][j] is the position of agent j in agent i's influencer order
+        self.influencer_rank_matrix = np.argsort(self.influencer_orders, axis=1)
+        self.influencer_ranks: list[list[int]] = self.influencer_rank_matrix.tolist()
 
     ## Interface
+    @property
+    def rounds_played(self) -> int:
+        return self._rounds_played
+
     def enetwork_play_round(self):
+        if self.tape:
+            self.tape.current_round = self._rounds_played
         self._standard_round_actions()
         self._lifecycle_round_actions()
         self._rounds_played += 1
-        
+
+    def snapshot(self) -> ENetworkState:
+        """ Capture the network's full state, including the rng, between rounds. """
+        return ENetworkState(
+            rounds_played=self._rounds_played,
+            credences=np.array([s.credence for s in self.scientists]),
+            rounds_of_experience=np.array([s.rounds_of_experience for s in self.scientists]),
+            is_skeptic=np.array([s.is_skeptic for s in self.scientists]),
+            is_propagandist=np.array([s.is_propagandist for s in self.scientists]),
+            influencer_orders=self.influencer_orders.copy(),
+            retiree_credences=tuple(self.retiree_credences),
+            rng_state=self.rng.bit_generator.state)
+
+    def restore(self, state: ENetworkState):
+        """ Return the network to a state captured by snapshot. The scientists are
+        re-initialized in place, so the state can come from any network with the same params. """
+        if len(state.credences) != len(self.scientists):
+            raise ValueError("Cannot restore a state with a different number of scientists")
+        self._rounds_played = state.rounds_played
+        for slot, s in enumerate(self.scientists):
+            s.__init__(float(state.credences[slot]), self.params, self.rng,
+                       bool(state.is_skeptic[slot]), bool(state.is_propagandist[slot]))
+            s.rounds_of_experience = int(state.rounds_of_experience[slot])
+            self._attach_tape(s, slot)
+        self.influencer_orders = state.influencer_orders.copy()
+        for slot, s in enumerate(self.scientists):
+            s.influencers = [self.scientists[i] for i in self.influencer_orders[slot]]
+        self._index_influencers()
+        self.retiree_credences = list(state.retiree_credences)
+        self.rng.bit_generator.state = state.rng_state
+
     ## Private methods
     def _standard_round_actions(self):
+        if not self.reporter_index:
+            self._reference_round_actions()
+            return
+        # Index the agents who actually published data this round. In polarized or
+        # abandoning networks this is a small share of the agents, and often no one
+        reports = {}
+        for slot, scientist in enumerate(self.scientists):
+            scientist.round_binomial_experiment = None # reset to None before new round starts
+            # Whether 'tis nobler to experiment
+            scientist.decide_round_research_action()
+            exp = scientist.report_experiment_data()
+            if exp:
+                reports[slot] = exp
+        self.credences_changed = bool(reports)
+        if reports:
+            self._update_on_reports(reports)
+        for scientist in self.scientists:
+            scientist.rounds_of_experience += 1
+
+    def _update_on_reports(self, reports: dict[int, BinomialExperiment]):
+        if (self.params.synchronous_updates
+                and len(reports) * len(self.scientists) >= SYNCHRONOUS_MATRIX_MIN_SIZE):
+            self._synchronous_updates(reports)
+            return
+        snapshot = None
+        if self.params.synchronous_updates:
+            snapshot = {s: s.credence for s in self.scientists}
+        if REPORTER_INDEX_MAX_SHARE * len(self.scientists) < len(reports):
+            # Most agents published, so building each updater's list of publishers would
+            # cost more than visiting every influencer
+            for scientist in self.scientists:
+                scientist.jeffrey_update_credence(snapshot)
+            return
+        # Visit only the publishers, sorted into each updater's influencer order
+        for slot, scientist in enumerate(self.scientists):
+            if scientist.is_skeptic or scientist.is_propagandist:
+                continue
+            publishers = sorted(reports, key=self.influencer_ranks[slot].__getitem__)
+            scientist.jeffrey_update_credence_on_reports(
+                [(self.scientists[i], reports[i]) for i in publishers], snapshot)
+
+    def _synchronous_updates(self, reports: dict[int, BinomialExperiment]):
+        """ Update all updaters at once, as a matrix operation. Every updater sees the same
+        publishers, each in its own influencer order, so step j updates every updater on its
+        j-th publisher. Distances are measured from the start-of-round credences, except the
+        distance of an updater to itself. """
+        updaters = np.array([slot for slot, s in enumerate(self.scientists)
+                             if not s.is_skeptic and not s.is_propagandist], dtype=np.int64)
+        if len(updaters) == 0:
+            return
+        snapshot = np.array([s.credence for s in self.scientists])
+        publishers = np.array(list(reports), dtype=np.int64)
+        # Row r: the publishers in the influencer order of updater r
+        orders = publishers[np.argsort(self.influencer_rank_matrix[np.ix_(updaters, publishers)], axis=1)]
+        table_p_E_H, table_p_E_nH = (np.array(t) for t in likelihood_table(self.params.trials, self.params.epsilon))
+        ks = np.zeros(len(self.scientists), dtype=np.int64)
+        for slot, exp in reports.items():
+            if exp.n != self.params.trials:
+                raise ValueError("Synchronous updates expect every experiment to have params.trials trials")
+            ks[slot] = exp.k
+
+        # Same arithmetic, in the same order, as Scientist._jeffrey_update_credence_on_experiment
+        credence = snapshot[updaters]
+        for j in range(len(publishers)):
+            influencers = orders[:, j]
+            p_E_H = table_p_E_H[ks[influencers]]
+            p_E_nH = table_p_E_nH[ks[influencers]]
+            p_E = credence * p_E_H + (1 - credence) * p_E_nH
+            p_H_E = credence * p_E_H / p_E
+            p_H_nE = credence * (1 - p_E_H) / (1 - p_E)
+            # An updater's distance to itself is 0, not to its start-of-round credence
+            dm = np.where(influencers == updaters, 0, np.abs(credence - snapshot[influencers]) * self.params.m)
+            posterior_p_E = 1 - np.minimum(1, dm) * (1 - p_E)
+            credence = np.where(credence > 0, p_H_E * posterior_p_E + p_H_nE * (1 - posterior_p_E), 0)
+        for slot, cr in zip(updaters.tolist(), credence.tolist()):
+            self.scientists[slot].credence = cr
+
+    def _reference_round_actions(self):
+        self.credences_changed = True
         for scientist in self.scientists:
             scientist.round_binomial_experiment = None # reset to None before new round starts
             # Whether 'tis nobler to experiment
             scientist.decide_round_research_action()
+        snapshot = None
+        if self.params.synchronous_updates:
+            snapshot = {s: s.credence for s in self.scientists}
         for scientist in self.scientists:
-            scientist.jeffrey_update_credence()
+            scientist.jeffrey_update_credence(snapshot)
         for scientist in self.scientists:
             scientist.rounds_of_experience += 1
 
@@ -74,16 +237,23 @@ class ENetwork():
             return
         
         params = self.params
-        retiree: Scientist = np.random.choice(experienced_scientists)
+        if self.tape:
+            retiree: Scientist = experienced_scientists[self.tape.retiree_index(len(experienced_scientists))]
+        else:
+            retiree = experienced_scientists[self.rng.integers(len(experienced_scientists))]
         if not retiree:
             raise ValueError("We should not reach this. No retiree agent found.")
         if retiree.is_skeptic or retiree.is_propagandist:
             prior = .5
+        elif self.tape:
+            prior = self.tape.entrant_prior()
         else:
             prior = params.admissions_priors_func(1, self.rng)[0]
         # re-initialize retiree to new agent
+        self.credences_changed = True
         self.retiree_credences.append(retiree.credence)
         retiree.__init__(prior, params, self.rng, retiree.is_skeptic, retiree.is_propagandist)
+        self._attach_tape(retiree, self.scientists.index(retiree))
         self._structure_scientific_network(self.scientists)
         # Idea for future:
         # Conversion from incentive structure
@@ -96,6 +266,10 @@ class ENetwork():
         #     intransigent_scientists.append(s)
         #     scientists.remove(s)
 
+    def _attach_tape(self, scientist: Scientist, slot: int):
+        if self.tape:
+            scientist.binomial_experiment_gen = TapeExperimentGen(self.tape, slot)
+
     def _add_all_influencers_for_updater(self,
                                          updater: Scientist,
                                          influencers: List[Scientist]):
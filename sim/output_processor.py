@@ -42,25 +42,53 @@ class OutputProcessor():
         )
     
     def record_sim(self, results: ENResultsCSVWritableSummary, path: str):
-        file_exists = os.path.isfile(path)
+        existing_headers = self.check_headers(path, results.headers)
         # res_dir = "/results"
         # Path(res_dir).mkdir(parents=True, exist_ok=True)
         # filename = Path(res_dir, filename).with_suffix('.csv')
         with open(path, newline='', mode = 'a') as csv_file:
             writer = csv.writer(csv_file)
-            if not file_exists:
+            if existing_headers is None:
                 writer.writerow(results.headers)
             writer.writerow(results.sim_data)
 
+    def csv_headers(self) -> list[str]:
+        """ The columns that data_for_writing produces. """
+        headers = ['sim_count']
+        headers.extend(ENParams._fields)
+        headers.append('sim time (s)')
+        headers.extend(ENLifecycleAnalyzedResults._fields)
+        return headers
+
+    def check_headers(self, path: str, headers: Optional[list[str]] = None) -> Optional[list[str]]:
+        """ Raise if the csv at path has different columns from headers (by default,
+        csv_headers), since appending to it would misalign the rows. Call this before
+        running sims, so that a sweep fails before doing any work. Returns the existing
+        headers, or None if there is no file yet. """
+        if headers is None:
+            headers = self.csv_headers()
+        existing_headers = self._existing_headers(path)
+        if existing_headers is not None and existing_headers != headers:
+            raise ValueError(
+                f"The columns of {path} do not match the results being recorded "
+                f"(missing: {[h for h in headers if h not in existing_headers]}, "
+                f"unexpected: {[h for h in existing_headers if h not in headers]}). "
+                "It was probably written by an older version. Move it aside or record to a new file.")
+        return existing_headers
+
+    def _existing_headers(self, path: str) -> Optional[list[str]]:
+        """ The header row of the csv at path, or None if there is no file or it is empty. """
+        if not os.path.isfile(path):
+            return None
+        with open(path, newline='') as csv_file:
+            return next(csv.reader(csv_file), None)
+
     def data_for_writing(self,
                          sims_summary: ENSimsSummary,
                          sim_count: int,
                          time_elapsed: float) -> ENResultsCSVWritableSummary:
-        headers = ['sim_count']
-        headers.extend([param_name for param_name in sims_summary.params._asdict().keys()])
-        headers.append('sim time (s)')
+        headers = self.csv_headers()
         summary_fields = [field for field in sims_summary.results_summary._asdict().keys()]
-        headers.extend(summary_fields)
         sim_data = [str(sim_count)]
         parameter_vals: list[str] = []
         for parameter_val in sims_summary.params:
@@ -0,0 +1,185 @@
+import csv
+import json
+import os
+import timeit
+from typing import Optional, List
+
+from sim.sim_models import *
+
+STATUS_REPORT_INTERVAL = 5.0 # Seconds between progress lines printed to the terminal
+
+class SweepProgress():
+    """ Tracks a sweep of param configs as individual sims complete. Reports throughput,
+    per-worker utilization, the current config and an ETA for the whole sweep, both to the
+    terminal and to a JSON status file that can be polled by e.g. a dashboard or job wrapper. """
+    def __init__(self,
+                 configs: List[ENParams],
+                 sim_count: int,
+                 status_path: Optional[str] = None,
+                 report_interval: float = STATUS_REPORT_INTERVAL):
+        self.configs = configs
+        self.sim_count = sim_count
+        self.status_path = status_path
+        self.report_interval = report_interval
+        self.sweep_start_time = timeit.default_timer()
+        self.config_index: Optional[int] = None
+        self.configs_done = 0
+        self.worker_count = 0
+        self._reset_config_stats()
+
+        self.calibration: dict[int, list[float]] = {}
+        # pop_size -> per-sim times (s) of completed configs. Used to estimate the
+        # time remaining for configs that have not started yet
+
+    ## Interface
+    def calibrate_from_csv(self, path: str):
+        """ Seed the ETA calibration from the 'sim time (s)' column of results recorded by
+        earlier runs (see OutputProcessor.record_sim). """
+        if not os.path.isfile(path):
+            return
+        with open(path, newline='') as csv_file:
+            for row in csv.DictReader(csv_file):
+                try:
+                    per_sim_time = float(row['sim time (s)']) / int(row['sim_count'])
+                    pop_size = int(row['pop_size'])
+                except (KeyError, TypeError, ValueError, ZeroDivisionError):
+                    continue # Rows from older result formats
+                self.calibration.setdefault(pop_size, []).append(per_sim_time)
+
+    def start_config(self, config_index: int, worker_count: int):
+        self.config_index = config_index
+        self.worker_count = worker_count
+        self._reset_config_stats()
+        self._write_status()
+
+    def sim_done(self, task_result: ENSimTaskResult):
+        self.sims_done += 1
+        self.worker_busy[task_result.worker] = (
+            self.worker_busy.get(task_result.worker, 0) + task_result.sim_time)
+        now = timeit.default_timer()
+        if now - self.last_report_time >= self.report_interval or self.sims_done == self.sim_count:
+            self.last_report_time = now
+            self._report()
+
+    def end_config(self, time_elapsed: float):
+        params = self.configs[self.config_index] if self.config_index is not None else None
+        if params is not None and self.sim_count > 0:
+            self.calibration.setdefault(params.pop_size, []).append(time_elapsed / self.sim_count)
+        self.configs_done += 1
+        self._write_status()
+
+    def finish(self):
+        self.config_index = None
+        self._write_status(finished=True)
+        print(f'Sweep finished: {self.configs_done} configs in {round(self._sweep_elapsed(), 1)}s')
+
+    ## Metrics
+    def sims_per_second(self) -> float:
+        elapsed = self._config_elapsed()
+        return self.sims_done / elapsed if elapsed > 0 else 0
+
+    def worker_utilization(self) -> dict[str, float]:
+        """ Share of the config's wall-clock time each worker has spent running sims. """
+        elapsed = self._config_elapsed()
+        if elapsed <= 0:
+            return {}
+        return {worker: min(busy / elapsed, 1) for worker, busy in self.worker_busy.items()}
+
+    def eta_seconds(self) -> Optional[float]:
+        """ Estimated seconds until the whole sweep is done. None until we have anything to
+        calibrate against. """
+        eta: float = 0
+        if self.config_index is not None:
+            remaining_sims = self.sim_count - self.sims_done
+            sims_per_second = self.sims_per_second()
+            if sims_per_second > 0:
+                eta += remaining_sims / sims_per_second
+            else:
+                estimate = self._estimated_config_time(self.configs[self.config_index])
+                if estimate is None:
+                    return None
+                eta += estimate
+            next_index = self.config_index + 1
+        else:
+            next_index = self.configs_done
+        for params in self.configs[next_index:]:
+            estimate = self._estimated_config_time(params)
+            if estimate is None:
+                return None
+            eta += estimate
+        return eta
+
+    ## Private methods
+    def _reset_config_stats(self):
+        self.sims_done = 0
+        self.worker_busy: dict[str, float] = {}
+        self.config_start_time = timeit.default_timer()
+        self.last_report_time = self.config_start_time
+
+    def _config_elapsed(self) -> float:
+        return timeit.default_timer() - self.config_start_time
+
+    def _sweep_elapsed(self) -> float:
+        return timeit.default_timer() - self.sweep_start_time
+
+    def _estimated_config_time(self, params: ENParams) -> Optional[float]:
+        """ Per-sim time for the same pop_size if we have seen it, otherwise scaled from the
+        closest pop_size we have seen. Each round every agent updates on every other agent, so
+        we scale quadratically with pop_size. Until a config has finished, we calibrate
+        against the current config's sims so far. """
+        calibration = self.calibration or self._current_config_calibration()
+        if not calibration:
+            return None
+        if params.pop_size in calibration:
+            times = calibration[params.pop_size]
+            return self.sim_count * sum(times) / len(times)
+        nearest = min(calibration, key=lambda pop: abs(pop - params.pop_size))
+        times = calibration[nearest]
+        scale = (params.pop_size / nearest) ** 2
+        return self.sim_count * scale * sum(times) / len(times)
+
+    def _current_config_calibration(self) -> dict[int, list[float]]:
+        if self.config_index is None or self.sims_done == 0:
+            return {}
+        pop_size = self.configs[self.config_index].pop_size
+        return {pop_size: [self._config_elapsed() / self.sims_done]}
+
+    def _report(self):
+        eta = self.eta_seconds()
+        eta_str = f'{round(eta)}s' if eta is not None else 'unknown'
+        utilization = self.worker_utilization()
+        mean_utilization = sum(utilization.values()) / self.worker_count if self.worker_count else 0
+        print(f'[config {self.config_index + 1}/{len(self.configs)}] '
+              f'{self.sims_done}/{self.sim_count} sims, '
+              f'{round(self.sims_per_second(), 2)} sims/s, '
+              f'worker utilization {round(100 * mean_utilization)}% '
+              f'({len(utilization)}/{self.worker_count} active), '
+              f'sweep ETA {eta_str}', flush=True)
+        self._write_status()
+
+    def _write_status(self, finished: bool = False):
+        if not self.status_path:
+            return
+        current = None
+        if self.config_index is not None:
+            current = {name: getattr(val, '__name__', val)
+                       for name, val in self.configs[self.config_index]._asdict().items()}
+        status = {
+            'finished': finished,
+            'config_index': self.config_index,
+            'config_count': len(self.configs),
+            'configs_done': self.configs_done,
+            'current_config': current,
+            'sim_count': self.sim_count,
+            'sims_done': self.sims_done,
+            'sims_per_second': self.sims_per_second(),
+            'worker_count': self.worker_count,
+            'worker_utilization': self.worker_utilization(),
+            'sweep_elapsed_s': self._sweep_elapsed(),
+            'eta_s': None if finished else self.eta_seconds(),
+        }
+        # Write to a temporary file first so that a poller never sees a half-written file
+        tmp_path = self.status_path + '.tmp'
+        with open(tmp_path, mode='w') as status_file:
+            json.dump(status, status_file, indent=2)
+        os.replace(tmp_path, self.status_path)
@@ -0,0 +1,164 @@
+import json
+import numpy as np
+from dataclasses import dataclass
+from typing import Optional
+
+from sim.experimentgen import BinomialExperiment
+from sim.sim_models import *
+
+DEFAULT_TAPE_BLOCK_ROUNDS = 1000
+# Rounds' worth of draws made per bulk call. Rounded up to a multiple of rounds_to_new_agent
+
+class RandomTape():
+    """ Pre-generated randomness for a sim: the binomial outcome of every agent slot
+    (position in ENetwork.scientists) in every round, the alternators' coin flips, and the
+    retiree pick and entrant prior of every lifecycle event. Draws are made in bulk, a block
+    of rounds at a time, from the tape's own rng, so they do not depend on the order in
+    which the sim reads them.
+
+    A tape can be saved and loaded to replay a run exactly, or shared across variants that
+    only differ in e.g. m or skeptic_count (common random numbers). The network's remaining
+    randomness (initial placement and influencer orderings) still comes from the sim rng,
+    whose starting state is recorded on the tape as sim_rng_state. """
+    def __init__(self,
+                 params: ENParams,
+                 rng: np.random.Generator,
+                 block_rounds: int = DEFAULT_TAPE_BLOCK_ROUNDS,
+                 sim_rng_state: Optional[dict] = None):
+        self.rng = rng
+        self.pop_size = params.pop_size
+        self.trials = params.trials
+        self.epsilon = params.epsilon
+        self.alternator = params.alternator
+        self.rounds_to_new_agent = params.rounds_to_new_agent
+        self.admissions_priors_func = params.admissions_priors_func
+        events_per_block = max(-(-block_rounds // params.rounds_to_new_agent), 1)
+        self.block_rounds = events_per_block * params.rounds_to_new_agent
+        self.sim_rng_state = sim_rng_state
+        self.current_round = 0 # Set by the network at the start of each round
+
+        self.binomials = np.empty((0, self.pop_size), dtype=np.int64) # rounds x agent slots
+        self.coin_flips = np.empty((0, self.pop_size), dtype=bool) # rounds x agent slots
+        self.retirement_draws = np.empty(0) # Uniform [0, 1) draw per lifecycle event
+        self.entrant_priors = np.empty(0) # Admission prior per lifecycle event
+
+    ## Interface
+    def binomial(self, slot: int) -> BinomialExperiment:
+        self._ensure_round(self.current_round)
+        return BinomialExperiment(int(self.binomials[self.current_round, slot]), self.trials)
+
+    def coin_flip(self, slot: int) -> bool:
+        self._ensure_round(self.current_round)
+        return bool(self.coin_flips[self.current_round, slot])
+
+    def retiree_index(self, candidate_count: int) -> int:
+        """ Index of the retiree among the candidate_count experienced scientists in the
+        lifecycle event of the current round. """
+        u = self.retirement_draws[self._lifecycle_event()]
+        return min(int(u * candidate_count), candidate_count - 1)
+
+    def entrant_prior(self) -> float:
+        return float(self.entrant_priors[self._lifecycle_event()])
+
+    def check_compatible(self, params: ENParams):
+        """ A tape can be used for any params whose draws it can supply. """
+        mismatches = [field for field, value in (('pop_size', self.pop_size),
+                                                 ('trials', self.trials),
+                                                 ('epsilon', self.epsilon),
+                                                 ('rounds_to_new_agent', self.rounds_to_new_agent))
+                      if getattr(params, field) != value]
+        if params.alternator and not self.alternator:
+            mismatches.append('alternator')
+        if params.admissions_priors_func.__name__ != self.admissions_priors_func.__name__:
+            mismatches.append('admissions_priors_func')
+        if mismatches:
+            raise ValueError(f"Random tape does not match params in {mismatches}")
+
+    def replay_rng(self) -> np.random.Generator:
+        """ A sim rng in the state the recorded run started from. """
+        if self.sim_rng_state is None:
+            raise ValueError("The tape did not record the state of the sim rng")
+        rng = np.random.default_rng()
+        rng.bit_generator.state = self.sim_rng_state
+        return rng
+
+    def save(self, path: str):
+        meta = {
+            'pop_size': self.pop_size,
+            'trials': self.trials,
+            'epsilon': self.epsilon,
+            'alternator': self.alternator,
+            'rounds_to_new_agent': self.rounds_to_new_agent,
+            'admissions_priors_func': self.admissions_priors_func.__name__,
+            'block_rounds': self.block_rounds,
+            'tape_rng_state': self.rng.bit_generator.state,
+            'sim_rng_state': self.sim_rng_state,
+        }
+        np.savez(path,
+                 binomials=self.binomials,
+                 coin_flips=self.coin_flips,
+                 retirement_draws=self.retirement_draws,
+                 entrant_priors=self.entrant_priors,
+                 meta=np.array(json.dumps(meta)))
+
+    @classmethod
+    def load(cls, path: str, params: ENParams) -> 'RandomTape':
+        """ Load a saved tape for use with params. Should a run read past the end of the
+        saved draws, the tape continues drawing from where its rng left off. """
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            rng = np.random.default_rng()
+            rng.bit_generator.state = meta['tape_rng_state']
+            recorded_params = params._replace(pop_size=meta['pop_size'],
+                                              trials=meta['trials'],
+                                              epsilon=meta['epsilon'],
+                                              alternator=meta['alternator'],
+                                              rounds_to_new_agent=meta['rounds_to_new_agent'])
+            tape = cls(recorded_params, rng, meta['block_rounds'], meta['sim_rng_state'])
+            if meta['admissions_priors_func'] != params.admissions_priors_func.__name__:
+                raise ValueError("Random tape does not match params in ['admissions_priors_func']")
+            tape.binomials = data['binomials']
+            tape.coin_flips = data['coin_flips']
+            tape.retirement_draws = data['retirement_draws']
+            tape.entrant_priors = data['entrant_priors']
+        tape.check_compatible(params)
+        return tape
+
+    ## Private methods
+    def _lifecycle_event(self) -> int:
+        event = self.current_round // self.rounds_to_new_agent
+        self._ensure_round(self.current_round)
+        return event
+
+    def _ensure_round(self, sim_round: int):
+        while sim_round >= len(self.binomials):
+            self._draw_block()
+
+    def _draw_block(self):
+        rng = self.rng
+        events = self.block_rounds // self.rounds_to_new_agent
+        binomials = rng.binomial(self.trials, 0.5 + self.epsilon, size=(self.block_rounds, self.pop_size))
+        if self.alternator:
+            coin_flips = rng.integers(2, size=(self.block_rounds, self.pop_size)).astype(bool)
+        else:
+            coin_flips = np.zeros((self.block_rounds, self.pop_size), dtype=bool) # Never read
+        retirement_draws = rng.random(events)
+        entrant_priors = np.asarray(self.admissions_priors_func(events, rng), dtype=float)
+        self.binomials = np.concatenate([self.binomials, binomials])
+        self.coin_flips = np.concatenate([self.coin_flips, coin_flips])
+        self.retirement_draws = np.concatenate([self.retirement_draws, retirement_draws])
+        self.entrant_priors = np.concatenate([self.entrant_priors, entrant_priors])
+
+@dataclass
+class TapeExperimentGen:
+    """ Drop-in replacement for ExperimentGen that reads an agent slot's draws from a tape. """
+    tape: RandomTape
+    slot: int
+
+    def experiment(self, n: int, epsilon):
+        if n != self.tape.trials or epsilon != self.tape.epsilon:
+            raise ValueError("Experiment does not match the random tape's trials and epsilon")
+        return self.tape.binomial(self.slot)
+
+    def coin_flip(self) -> bool:
+        return self.tape.coin_flip(self.slot)
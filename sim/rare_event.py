@@ -0,0 +1,176 @@
+import numpy as np
+from typing import Callable, NamedTuple, Optional, List
+
+from sim.executors import *
+from sim.network import ENetwork, ENetworkState
+from sim.scientist import LOW_STOP, Scientist
+from sim.sim_models import *
+
+CONFIDENT_CREDENCE = .99 # As in SimMetrics.prop_truth_confidently
+
+class ENRareEventSpec(NamedTuple):
+    """ What to estimate the probability of, and how to measure progress towards it. """
+    name: str
+    score: Callable[[ENetwork], float]
+    # Higher means closer to the event
+    levels: tuple[float, ...]
+    # Increasing score thresholds. A trajectory is split each time it first reaches the next level
+    event: Callable[[ENetwork], bool]
+    # Whether the network is in the rare state. Checked after every round
+
+class ENRareEventResults(NamedTuple):
+    event: str
+    probability: float
+    # Mean of the replicate estimates. Each replicate is an unbiased estimate of the probability
+    # that the event happens before max_rounds
+    variance: float # Variance of the mean of the replicate estimates
+    standard_error: float
+    relative_error: Optional[float] # standard_error / probability. None if probability is 0
+    replicate_estimates: List[float]
+    stage_probabilities: List[float]
+    # Mean across replicates of the proportion of trajectories that made it from one level
+    # to the next. The last stage is from the highest level to the event
+    particle_count: int
+    replicate_count: int
+
+def _updaters(network: ENetwork) -> List[Scientist]:
+    """ The agents whose credence responds to evidence, i.e. not skeptics or propagandists. """
+    return [s for s in network.scientists if not s.is_skeptic and not s.is_propagandist]
+
+def mean_updater_credence(network: ENetwork) -> float:
+    return float(np.mean([s.credence for s in _updaters(network)]))
+
+def abandonment_score(network: ENetwork) -> float:
+    return 1 - mean_updater_credence(network)
+
+def abandoned(network: ENetwork) -> bool:
+    return all(s.credence < LOW_STOP for s in _updaters(network))
+
+def polarization_score(network: ENetwork) -> float:
+    updaters = _updaters(network)
+    if not any(s.credence >= LOW_STOP for s in updaters):
+        return 0
+    return sum(s.credence < LOW_STOP for s in updaters) / len(updaters)
+
+def polarized(network: ENetwork) -> bool:
+    credences = [s.credence for s in _updaters(network)]
+    low = sum(cr < LOW_STOP for cr in credences)
+    confident = sum(cr > CONFIDENT_CREDENCE for cr in credences)
+    return low > 0 and confident > 0 and low + confident == len(credences)
+
+def abandonment_spec(levels: tuple[float, ...] = (.3, .4, .5, .6)) -> ENRareEventSpec:
+    """ Every updater drops below LOW_STOP, i.e. the network abandons the better theory.
+    Scored by how far the mean updater credence has fallen from 1. Entrants' priors are
+    uniform by default, so typical runs already reach scores below .3 and the default
+    levels start there. The best levels depend on the config: tune them so that no stage in
+    the results' stage_probabilities is close to 1 (wasted effort) or 0 (few survivors). """
+    return ENRareEventSpec('abandonment', abandonment_score, levels, abandoned)
+
+def polarization_spec(levels: tuple[float, ...] = (.1, .2, .3, .4)) -> ENRareEventSpec:
+    """ The updaters split into a group that has stopped experimenting (below LOW_STOP) and a
+    group that is confident in the better theory, with no one in between. Scored by the
+    proportion of updaters below LOW_STOP, as long as someone is still experimenting. Tune
+    the levels per config, as for abandonment_spec. """
+    return ENRareEventSpec('polarization', polarization_score, levels, polarized)
+
+class ENRareEventEstimator():
+    """ Fixed-effort multilevel splitting. Each stage runs particle_count trajectories until
+    they reach the next score level or max_rounds. The trajectories that make it are
+    snapshotted, and the next stage restarts from copies of them drawn at random, each with
+    a fresh rng stream. The product of the stages' success proportions is an unbiased estimate
+    of the probability of the event. We run independent replicates of the whole scheme to get
+    the variance of the estimate.
+
+    E.g. ENRareEventEstimator(ENParams(pop_size=10, epsilon=0.1, m=3), abandonment_spec()).estimate() """
+    def __init__(self,
+                 params: ENParams,
+                 spec: ENRareEventSpec,
+                 particle_count: int = 100,
+                 replicate_count: int = 10,
+                 seed: int = 253,
+                 executor: Optional[ENSimExecutor] = None):
+        if list(spec.levels) != sorted(spec.levels):
+            raise ValueError("Levels need to be in increasing order")
+        if replicate_count < 2:
+            raise ValueError("At least two replicates are needed to estimate the variance")
+        self.params = params
+        self.spec = spec
+        self.particle_count = particle_count
+        self.replicate_count = replicate_count
+        self.seed = seed
+        self.executor = executor if executor else SerialExecutor()
+
+    ## Interface
+    def estimate(self) -> ENRareEventResults:
+        seeds = np.random.SeedSequence(self.seed).spawn(self.replicate_count)
+        replicates: List[Optional[tuple[float, List[float]]]] = [None] * self.replicate_count
+        for index, replicate in self.executor.map_unordered(self.run_replicate, list(enumerate(seeds))):
+            replicates[index] = replicate
+        estimates = [r[0] for r in replicates if r is not None]
+        stage_probabilities = np.mean([r[1] for r in replicates if r is not None], axis=0).tolist()
+        probability = float(np.mean(estimates))
+        variance = float(np.var(estimates, ddof=1) / len(estimates))
+        standard_error = float(np.sqrt(variance))
+        return ENRareEventResults(
+            event=self.spec.name,
+            probability=probability,
+            variance=variance,
+            standard_error=standard_error,
+            relative_error=standard_error / probability if probability > 0 else None,
+            replicate_estimates=estimates,
+            stage_probabilities=stage_probabilities,
+            particle_count=self.particle_count,
+            replicate_count=len(estimates))
+
+    def run_replicate(self, task: tuple[int, np.random.SeedSequence]) -> tuple[int, tuple[float, List[float]]]:
+        """ One run of the splitting scheme. Returns the replicate's index and its estimate,
+        together with the success proportion of each stage. """
+        index, seed_seq = task
+        particle_seeds = iter(seed_seq.spawn(self.particle_count * (len(self.spec.levels) + 1)))
+        resample_rng = np.random.default_rng(seed_seq.spawn(1)[0])
+        stage_probabilities: List[float] = []
+
+        # Stage 0 starts from fresh networks
+        network: Optional[ENetwork] = None
+        entrance_states: List[ENetworkState] = []
+        for _ in range(self.particle_count):
+            network = ENetwork(np.random.default_rng(next(particle_seeds)), self.params)
+            state = self._run_to_level(network, 0)
+            if state is not None:
+                entrance_states.append(state)
+        stage_probabilities.append(len(entrance_states) / self.particle_count)
+
+        for stage in range(1, len(self.spec.levels) + 1):
+            if not entrance_states or network is None:
+                stage_probabilities.extend([0.0] * (len(self.spec.levels) + 1 - stage))
+                break
+            starts = resample_rng.integers(len(entrance_states), size=self.particle_count)
+            next_states: List[ENetworkState] = []
+            for start in starts:
+                network.restore(entrance_states[start])
+                # Fork: continue from the same state with a fresh stream of randomness
+                network.rng.bit_generator.state = np.random.default_rng(next(particle_seeds)).bit_generator.state
+                state = self._run_to_level(network, stage)
+                if state is not None:
+                    next_states.append(state)
+            stage_probabilities.append(len(next_states) / self.particle_count)
+            entrance_states = next_states
+        return index, (float(np.prod(stage_probabilities)), stage_probabilities)
+
+    ## Private methods
+    def _run_to_level(self, network: ENetwork, stage: int) -> Optional[ENetworkState]:
+        """ Play rounds until the network reaches the stage's level (or, in the last stage,
+        the event itself). Returns the network's state at that point, or None if it did not
+        get there within max_rounds. Reaching the event counts as reaching every level. """
+        if self._reached(network, stage):
+            return network.snapshot()
+        while network.rounds_played < self.params.max_rounds:
+            network.enetwork_play_round()
+            if self._reached(network, stage):
+                return network.snapshot()
+        return None
+
+    def _reached(self, network: ENetwork, stage: int) -> bool:
+        if self.spec.event(network):
+            return True
+        return stage < len(self.spec.levels) and self.spec.score(network) >= self.spec.levels[stage]
@@ -0,0 +1,121 @@
+import os
+from typing import Any, NamedTuple, Optional, Union
+
+import pandas as pd
+
+from sim.simsetup import *
+
+# Columns written by OutputProcessor.data_for_writing alongside the ENParams fields
+SIM_COUNT_KEY = 'sim_count'
+SIM_TIME_KEY = 'sim time (s)'
+
+LEGACY_COLUMN_NAMES = {'scientist_init_popcount': 'pop_size'}
+# Older results files used different names for some params
+
+PARAM_TYPES = {'sim_count': int, **ENParams.__annotations__}
+
+class ResultsFile(NamedTuple):
+    path: str
+    sim_type: Optional[ENSimType] # None for results files not produced by quick_setup
+    mtime: float
+    param_values: dict[str, list[Any]]
+    # The distinct values each ENParams field takes in the file, e.g. {'pop_size': [10, 20, 50], ...}
+
+class ResultsCatalog():
+    """ Indexes results files written by OutputProcessor.record_sim and caches their parsed,
+    typed frames. A cached frame is re-read only when its file's mtime changes.
+
+    Query with get, e.g. catalog.get(ENSimType.LIFECYCLE, pop_size=20, epsilon=0.1). """
+    def __init__(self, directory: str = '.'):
+        self.directory = directory
+        self._frames: dict[str, tuple[float, pd.DataFrame]] = {}
+        self._groups: dict[tuple[str, tuple[str, ...]], tuple[float, dict[tuple, pd.DataFrame]]] = {}
+
+    ## Interface
+    def path(self, sim_type: Union[ENSimType, str]) -> str:
+        """ The results file for a sim type. A plain filename is also accepted, so that results
+        from run_configs with custom params can be queried in the same way. """
+        filename = SIM_TYPE_FILENAMES[sim_type] if isinstance(sim_type, ENSimType) else sim_type
+        return os.path.join(self.directory, filename)
+
+    def index(self) -> list[ResultsFile]:
+        """ All results files in the catalog directory, with the param values each contains. """
+        sim_types = {filename: sim_type for sim_type, filename in SIM_TYPE_FILENAMES.items()}
+        results_files: list[ResultsFile] = []
+        for filename in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, filename)
+            if not filename.endswith('.csv') or not self._is_results_file(path):
+                continue
+            df = self._frame(path)
+            param_values = {field: sorted(df[field].dropna().unique().tolist())
+                            for field in ENParams._fields if field in df.columns}
+            results_files.append(
+                ResultsFile(path, sim_types.get(filename), os.path.getmtime(path), param_values))
+        return results_files
+
+    def get(self, sim_type: Union[ENSimType, str], **params: Any) -> pd.DataFrame:
+        """ The rows of the results file for sim_type whose params match all of the given
+        keyword arguments. Returns a copy, so callers are free to modify it. """
+        path = self.path(sim_type)
+        if not params:
+            return self._frame(path).copy()
+        for field in params:
+            if field not in PARAM_TYPES:
+                raise ValueError(f"Unknown param '{field}'. Expected 'sim_count' or an ENParams field.")
+        keys = tuple(sorted(params))
+        groups = self._grouped(path, keys)
+        group = groups.get(tuple(params[key] for key in keys))
+        if group is None:
+            return self._frame(path).iloc[0:0].copy()
+        return group.copy()
+
+    def clear(self):
+        self._frames.clear()
+        self._groups.clear()
+
+    ## Private methods
+    def _frame(self, path: str) -> pd.DataFrame:
+        mtime = os.path.getmtime(path)
+        cached = self._frames.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        df = pd.read_csv(path, na_values=['N/A'])
+        df = df.rename(columns=LEGACY_COLUMN_NAMES)
+        df = self._typed(df)
+        self._frames[path] = (mtime, df)
+        return df
+
+    def _grouped(self, path: str, keys: tuple[str, ...]) -> dict[tuple, pd.DataFrame]:
+        """ Partition a file's rows by the values of keys once, so that repeated queries
+        (e.g. one per plot panel) are dict lookups rather than scans over the frame. """
+        df = self._frame(path)
+        mtime = self._frames[path][0]
+        cached = self._groups.get((path, keys))
+        if cached and cached[0] == mtime:
+            return cached[1]
+        missing = [key for key in keys if key not in df.columns]
+        if missing:
+            raise ValueError(f"Results file {path} has no column(s) {missing}")
+        groups: dict[tuple, pd.DataFrame] = {}
+        for group_key, group in df.groupby(list(keys), sort=False):
+            groups[group_key if isinstance(group_key, tuple) else (group_key,)] = group
+        self._groups[(path, keys)] = (mtime, groups)
+        return groups
+
+    def _typed(self, df: pd.DataFrame) -> pd.DataFrame:
+        for field, field_type in PARAM_TYPES.items():
+            if field not in df.columns:
+                continue
+            if field_type is bool and df[field].dtype == object:
+                df[field] = df[field].map({'True': True, 'False': False})
+            elif field_type in (int, float):
+                df[field] = pd.to_numeric(df[field])
+        for field in [SIM_TIME_KEY, *ENLifecycleAnalyzedResults._fields]:
+            if field in df.columns:
+                df[field] = pd.to_numeric(df[field], errors='coerce')
+        return df
+
+    def _is_results_file(self, path: str) -> bool:
+        with open(path, newline='') as csv_file:
+            header = csv_file.readline()
+        return header.startswith(SIM_COUNT_KEY + ',') and SIM_TIME_KEY in header
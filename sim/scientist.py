@@ -1,5 +1,6 @@
 from __future__ import annotations
 import numpy as np
+from functools import lru_cache
 from sim.experimentgen import BinomialExperiment, ExperimentGen
 from typing import Optional
 
@@ -7,6 +8,16 @@ from sim.sim_models import ENParams
 
 LOW_STOP = .5
 
+@lru_cache(maxsize=None)
+def likelihood_table(trials: int, epsilon: float) -> tuple[tuple[float, ...], tuple[float, ...]]:
+    """ P(E|H) and P(E|~H) for every possible number of successes k (0...trials), using the
+    truncated likelihoods (see Scientist._truncated_likelihood). The table only depends on
+    the config, so it is computed once and shared by every sim run in the process. """
+    p = 0.5 + epsilon
+    p_E_H = tuple(p ** k * (1 - p) ** (trials - k) for k in range(trials + 1))
+    p_E_nH = tuple((1-p) ** k * p ** (trials - k) for k in range(trials + 1))
+    return p_E_H, p_E_nH
+
 """ A scientist who runs experiments on a binomial distribution, and who stops 
 experimenting when credence is below a certain threshold."""
 class Scientist(): 
@@ -55,7 +66,7 @@ class Scientist():
         if self.credence < LOW_STOP:
             self.round_binomial_experiment = None
         elif self.params.alternator and self.credence == .5:
-            try_B: bool = np.random.choice([True, False])
+            try_B: bool = self.binomial_experiment_gen.coin_flip()
             if try_B:
                 self._experiment(self.params.trials, self.params.epsilon)
             else:
@@ -66,35 +77,66 @@ class Scientist():
     def add_jeffrey_influencer(self, influencer: Scientist):
         self.influencers.append(influencer)
 
-    def jeffrey_update_credence(self):
+    def jeffrey_update_credence(self, snapshot: Optional[dict[Scientist, float]] = None):
+        """ If given, snapshot holds the influencers' credences at the start of the round, and
+        the distance to an influencer is measured from its snapshot credence (see
+        ENParams.synchronous_updates). The distance to the agent itself is always 0. """
         if self.is_skeptic or self.is_propagandist:
             return
         for influencer in self.influencers:
-            self._jeffrey_update_credence_on_influencer(influencer)
+            self._jeffrey_update_credence_on_influencer(influencer, snapshot)
+
+    def jeffrey_update_credence_on_reports(self,
+                                           reports: list[tuple[Scientist, BinomialExperiment]],
+                                           snapshot: Optional[dict[Scientist, float]] = None):
+        """ Same as jeffrey_update_credence, given the (influencer, data) pairs of only the
+        influencers who reported data, in influencer order. """
+        if self.is_skeptic or self.is_propagandist:
+            return
+        for influencer, exp in reports:
+            influencer_credence = snapshot[influencer] if snapshot is not None else None
+            self._jeffrey_update_credence_on_experiment(influencer, exp, influencer_credence)
 
-    def dm(self, influencer: Scientist) -> float:
-        d = abs(self.credence - influencer.credence)
+    def dm(self, influencer: Scientist, influencer_credence: Optional[float] = None) -> float:
+        if influencer_credence is None or influencer is self:
+            # An agent's own credence is private, so it is always up to date
+            influencer_credence = influencer.credence
+        d = abs(self.credence - influencer_credence)
         return d * self.params.m
 
     # Private methods   
     def _experiment(self, n: int, epsilon):
         self.round_binomial_experiment = self.binomial_experiment_gen.experiment(n, epsilon)
     
-    def _jeffrey_update_credence_on_influencer(self, influencer: Scientist): 
+    def _jeffrey_update_credence_on_influencer(self,
+                                               influencer: Scientist,
+                                               snapshot: Optional[dict[Scientist, float]] = None):
         exp = influencer.report_experiment_data()
         if exp:
-            k = exp.k
-            n = exp.n
+            influencer_credence = snapshot[influencer] if snapshot is not None else None
+            self._jeffrey_update_credence_on_experiment(influencer, exp, influencer_credence)
+
+    def _jeffrey_update_credence_on_experiment(self,
+                                               influencer: Scientist,
+                                               exp: BinomialExperiment,
+                                               influencer_credence: Optional[float] = None):
+        k = exp.k
+        n = exp.n
+        if n == self.params.trials:
+            table_p_E_H, table_p_E_nH = likelihood_table(n, self.params.epsilon)
+            p_E_H = table_p_E_H[k]
+            p_E_nH = table_p_E_nH[k]
+        else:
             p = 0.5 + self.params.epsilon
             p_E_H = self._truncated_likelihood(k, n, p)
             p_E_nH = self._truncated_p_E_nH(k, n, p)
-            p_E = self._marginal_likelihood(self.credence, p_E_H, p_E_nH)
-            p_H_E = self.credence * p_E_H / p_E
-            p_H_nE = self.credence * (1 - p_E_H) / (1 - p_E)
-            dm = self.dm(influencer)
-            # No anti-updating, simply ignore evidence past certain point
-            posterior_p_E = 1 - min(1, dm) * (1 - p_E)
-            self.credence = self._jeffrey_calculate_posterior(self.credence, p_H_E, posterior_p_E, p_H_nE)
+        p_E = self._marginal_likelihood(self.credence, p_E_H, p_E_nH)
+        p_H_E = self.credence * p_E_H / p_E
+        p_H_nE = self.credence * (1 - p_E_H) / (1 - p_E)
+        dm = self.dm(influencer, influencer_credence)
+        # No anti-updating, simply ignore evidence past certain point
+        posterior_p_E = 1 - min(1, dm) * (1 - p_E)
+        self.credence = self._jeffrey_calculate_posterior(self.credence, p_H_E, posterior_p_E, p_H_nE)
 
     def _jeffrey_calculate_posterior(self, 
                                      prior: float, 
@@ -60,14 +60,24 @@ class SimMetrics:
             self.non_skep_brier_penalty_total: float = 0
             # Same as above, but excludes skeptics
 
+            self._last_round_stats: Optional[tuple[float, float, int, int]] = None
+            # The previous round's contributions to the four tallies above. Reused when
+            # no credence changed in a round
+
         def update_brier_stats(self, simulation: ENSimulation):
             en = simulation.epistemic_network
-            round_briers = [self.brier_score(s.credence) for s in en.scientists]
-            self.brier_penalty_total += sum(round_briers)
-            round_non_skeptic_briers = [self.brier_score(s.credence) for s in en.scientists if not s.is_skeptic]
-            self.non_skep_brier_penalty_total += sum(round_non_skeptic_briers)
-            self.max_obtainable_brier_penalty += len(en.scientists)
-            self.non_skep_obtainable_brier_penalty += len([s for s in en.scientists if not s.is_skeptic])
+            if en.credences_changed or self._last_round_stats is None:
+                round_briers = [self.brier_score(s.credence) for s in en.scientists]
+                round_non_skeptic_briers = [self.brier_score(s.credence) for s in en.scientists if not s.is_skeptic]
+                self._last_round_stats = (sum(round_briers),
+                                          sum(round_non_skeptic_briers),
+                                          len(en.scientists),
+                                          len([s for s in en.scientists if not s.is_skeptic]))
+            round_brier, round_non_skeptic_brier, pop, non_skeptic_pop = self._last_round_stats
+            self.brier_penalty_total += round_brier
+            self.non_skep_brier_penalty_total += round_non_skeptic_brier
+            self.max_obtainable_brier_penalty += pop
+            self.non_skep_obtainable_brier_penalty += non_skeptic_pop
 
         def brier_score(self, credence: float) -> float:
             return (credence - 1)**2
@@ -30,6 +30,13 @@ class ENParams(NamedTuple):
     init_priors_func: Priors_Func = confident_priors
     # Controls priors distribution for the initial network
 
+    synchronous_updates: bool = False
+    # If True, all agents update on the credences everyone had at the start of the round
+    # (a snapshot), rather than on credences that agents earlier in the round have already
+    # updated. Each agent's update is then independent of the others', so a round's updates
+    # can run as one matrix operation. Intended for very large networks. An agent's distance
+    # to itself is still 0, since its own credence is never out of date
+
 ## RESULTS
 class ENSingleSimResults(NamedTuple):
     ## SCORING
@@ -100,3 +107,10 @@ class ENSimsSummary(NamedTuple):
 class ENResultsCSVWritableSummary(NamedTuple):
     headers: List[str]
     sim_data: List[str]
+
+## EXECUTION
+class ENSimTaskResult(NamedTuple):
+    index: int # Position of the sim's rng stream in the config's list of streams
+    worker: str # Identifies the process/thread that ran the sim
+    sim_time: float # Wall-clock seconds the sim took
+    results: Optional[ENSingleSimResults]
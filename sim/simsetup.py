@@ -1,8 +1,13 @@
 import numpy as np
+import os
+import threading
 import timeit
-from multiprocessing import Pool, cpu_count
+from sim.executors import *
 from sim.network import *
 from sim.output_processor import OutputProcessor
+from sim.progress import SweepProgress
+from sim.random_tape import *
+from sim.scientist import likelihood_table
 from sim.sim import *
 from sim.sim_models import *
 from typing import Optional, List
@@ -25,12 +30,32 @@ class ENSimType(Enum):
     LIFECYCLE_W_PROPAGANDIST = auto()
     LIFECYCLE_W_PROPAGANDIST_N_SKEPTIC = auto()
 
+SIM_TYPE_FILENAMES = {
+    ENSimType.LIFECYCLE: LIFECYCLE_FILENAME,
+    ENSimType.LIFECYCLE_W_SKEPTIC: LIFECYCLE_W_SKEPTICS_FILENAME,
+    ENSimType.LIFECYCLE_W_ALTERNATOR_SKEPTIC: LIFECYCLE_W_ALTERNATOR_SKEPTICS_FILENAME,
+    ENSimType.LIFECYCLE_W_PROPAGANDIST: LIFECYCLE_W_PROPAGANDIST_FILENAME,
+    ENSimType.LIFECYCLE_W_PROPAGANDIST_N_SKEPTIC: LIFECYCLE_W_PROPAGANDIST_N_SKEPTIC_FILENAME,
+}
+
+def status_path_for(output_filename: str) -> str:
+    """ Where SweepProgress writes the status of a sweep whose results go to output_filename. """
+    return os.path.splitext(output_filename)[0] + '_status.json'
+
 class ENSimSetup():
     def __init__(self,
                  sim_count: int,
-                 sim_type: Optional[ENSimType]):
+                 sim_type: Optional[ENSimType],
+                 executor_type: ExecutorType = ExecutorType.PROCESS,
+                 worker_count: Optional[int] = None,
+                 random_tape: bool = False):
         self.sim_count = sim_count
         self.sim_type = sim_type
+        self.executor = make_executor(executor_type, worker_count)
+        # Sims get independent rng streams, so all executor types give the same results
+        self.random_tape = random_tape
+        # If True, each sim draws its experiments, retirements and entrant priors in bulk
+        # up front (see RandomTape). Gives different, but equally distributed, results
         self.output_processor = OutputProcessor()
     
     def quick_setup(self):
@@ -78,39 +103,90 @@ class ENSimSetup():
         # we will get the *same* binomial experiments each simulation since the subprocesses share the
         # parent's initial rng state.
         # https://numpy.org/doc/stable/reference/random/parallel.html
+        # Fail before running any sims if we could not append to an existing results file
+        self.output_processor.check_headers(output_filename)
         child_seeds = [np.random.SeedSequence(253 + i).spawn(self.sim_count) for i in range(len(configs))]
+        progress = SweepProgress(configs, self.sim_count, status_path_for(output_filename))
+        progress.calibrate_from_csv(output_filename)
         for i, param_config in enumerate(configs):
             print(f'Running config: {param_config}')
             print('...')
             rng_streams = [np.random.default_rng(s) for s in child_seeds[i]]
             start_time = timeit.default_timer()
-            results_summary = self.run_sims_for_param_config(param_config, rng_streams)
+            results_summary = self.run_sims_for_param_config(param_config, rng_streams, progress, i)
             time_elapsed = timeit.default_timer() - start_time
+            progress.end_config(time_elapsed)
             print(f'Time elapsed: {time_elapsed}s')
             print()
             csv_data = self.output_processor.data_for_writing(results_summary, self.sim_count, time_elapsed)
             self.output_processor.record_sim(csv_data, output_filename)
+        progress.finish()
 
-    def run_sims_for_param_config(self, params: ENParams, rng_streams: List[np.random.Generator]) -> ENSimsSummary:
+    def run_sims_for_param_config(self,
+                                  params: ENParams,
+                                  rng_streams: List[np.random.Generator],
+                                  progress: Optional[SweepProgress] = None,
+                                  config_index: int = 0) -> ENSimsSummary:
         if not rng_streams:
             raise ValueError("There needs to be at least one rng.")
-        pool = Pool(processes=max(cpu_count() - 1, 1))
-        results_from_sims = pool.starmap(self.run_sim,
-                                        [(rng, params) for rng in rng_streams])
-        pool.close()
-        pool.join()
-        #Commented code is for testing a single run with breakpoints
-        # results_from_sims = [self.run_sim(rng_streams[0], params)]
+        if progress:
+            progress.start_config(config_index, self.executor.worker_count)
+        # Per-config precomputation, shared read-only by all sims run in this process
+        likelihood_table(params.trials, params.epsilon)
+        # Sims complete in arbitrary order. We put results back in rng stream order so that
+        # the summary does not depend on scheduling.
+        results_from_sims: list[Optional[ENSingleSimResults]] = [None] * len(rng_streams)
+        tasks = [(i, rng, params) for i, rng in enumerate(rng_streams)]
+        for task_result in self.executor.map_unordered(self.run_sim_task, tasks):
+            results_from_sims[task_result.index] = task_result.results
+            if progress:
+                progress.sim_done(task_result)
+        # Use ExecutorType.SERIAL for testing runs with breakpoints
         if None in results_from_sims:
             raise Warning("Failed to get results from at least one simulation.")
         results: list[ENSingleSimResults] = [r for r in results_from_sims if r is not None]
         sims_summary = self.output_processor.process_sims_results(results, params)
         return ENSimsSummary(params, sims_summary)
 
+    def run_sim_task(self, task: tuple[int, np.random.Generator, ENParams]) -> ENSimTaskResult:
+        """ Run a single sim and time it, so that progress can be reported as sims complete. """
+        index, rng, params = task
+        start_time = timeit.default_timer()
+        results = self.run_sim(rng, params)
+        sim_time = timeit.default_timer() - start_time
+        worker = f'{os.getpid()}:{threading.current_thread().name}'
+        return ENSimTaskResult(index, worker, sim_time, results)
+
     def run_sim(self,
                 rng: np.random.Generator,
                 params: ENParams) -> Optional[ENSingleSimResults]:
-        network = ENetwork(rng, params)
+        tape = self.make_tape(rng, params) if self.random_tape else None
+        network = ENetwork(rng, params, tape)
+        simulation = ENSimulation(network, params)
+        simulation.run_sim()
+        return simulation.results
+
+    def make_tape(self,
+                  rng: np.random.Generator,
+                  params: ENParams) -> RandomTape:
+        """ The random tape that run_sim uses for a sim with this rng, when random_tape is
+        True. E.g. to save the tape of sim i of config c in a run_configs sweep, pass
+        np.random.default_rng(np.random.SeedSequence(253 + c).spawn(sim_count)[i]) as rng
+        and then call save on the tape. The tape records its rng state, so it can be saved
+        before or after it is used: replay_sim makes any draws that were not saved. """
+        # A jumped copy of the sim's bit generator gives the tape its own stream, derived
+        # from the sim's rng state alone (unlike rng.spawn, this survives pickling)
+        tape_rng = np.random.Generator(rng.bit_generator.jumped())
+        tape_block_rounds = min(params.max_rounds, DEFAULT_TAPE_BLOCK_ROUNDS)
+        return RandomTape(params, tape_rng, tape_block_rounds, rng.bit_generator.state)
+
+    def replay_sim(self,
+                   tape: RandomTape,
+                   params: ENParams) -> Optional[ENSingleSimResults]:
+        """ Re-run a sim from its random tape (see RandomTape.save and RandomTape.load). With
+        the params of the recorded run, this reproduces it exactly. With other params that the
+        tape is compatible with (e.g. a different m), the variant sees the same draws. """
+        network = ENetwork(tape.replay_rng(), params, tape)
         simulation = ENSimulation(network, params)
         simulation.run_sim()
         return simulation.results
@@ -0,0 +1,286 @@
+import numpy as np
+import timeit
+from statistics import NormalDist
+from typing import Callable, NamedTuple, Optional, List
+
+from sim.simsetup import *
+
+ENEngine = Callable[[np.random.Generator, ENParams], Optional[ENSingleSimResults]]
+# Anything that runs a single sim, like ENSimSetup.run_sim
+
+VALIDATION_MAX_ROUNDS = 300
+BOOTSTRAP_TAIL_RESAMPLES = 10
+# Expected number of bootstrap resamples beyond each end of a confidence interval
+BOOTSTRAP_CHUNK_SIZE = 1000
+# Resamples drawn at a time, to bound memory when alpha is small
+
+REPRESENTATIVE_CONFIGS = [
+    ENParams(pop_size=pop_size, epsilon=e, m=m, max_rounds=VALIDATION_MAX_ROUNDS, **variant)
+    for pop_size, e, m in ((10, 0.01, 1.5), (20, 0.05, 2.5), (10, 0.1, 0))
+    for variant in (
+        {},                                                     # Baseline lifecycle
+        {'skeptic_count': 1},                                   # Skeptic
+        {'skeptic_count': 1, 'alternator': True},               # Alternator skeptic
+        {'propagandist': True},                                 # Propagandist
+        {'skeptic_count': 1, 'propagandist': True},             # Propagandist and skeptic
+        {'rounds_to_new_agent': 2, 'admissions_priors_func': confident_priors},
+        # Fast lifecycle turnover
+    )]
+
+def reference_engine(rng: np.random.Generator, params: ENParams) -> Optional[ENSingleSimResults]:
+    """ Every updater visits every influencer, every round. """
+    simulation = ENSimulation(ENetwork(rng, params, reporter_index=False), params)
+    simulation.run_sim()
+    return simulation.results
+
+def reporter_index_engine(rng: np.random.Generator, params: ENParams) -> Optional[ENSingleSimResults]:
+    """ The default engine (see ENetwork.reporter_index). """
+    return ENSimSetup(1, None, ExecutorType.SERIAL).run_sim(rng, params)
+
+def random_tape_engine(rng: np.random.Generator, params: ENParams) -> Optional[ENSingleSimResults]:
+    return ENSimSetup(1, None, ExecutorType.SERIAL, random_tape=True).run_sim(rng, params)
+
+def synchronous_engine(rng: np.random.Generator, params: ENParams) -> Optional[ENSingleSimResults]:
+    """ Runs params with synchronous updates (see ENParams.synchronous_updates). Validate
+    against reference_engine in distribution mode to see where the synchronous mode departs
+    from the asynchronous default. In bit-exact mode, against synchronous_reference_engine,
+    this checks the matrix implementation of the synchronous mode. """
+    return reporter_index_engine(rng, params._replace(synchronous_updates=True))
+
+def synchronous_reference_engine(rng: np.random.Generator, params: ENParams) -> Optional[ENSingleSimResults]:
+    return reference_engine(rng, params._replace(synchronous_updates=True))
+
+## Results
+class ENFieldComparison(NamedTuple):
+    field: str # An ENSingleSimResults field
+    ks_statistic: float
+    ks_p: float
+    ad_statistic: float
+    ad_p: float # Permutation p-value
+    mean_diff: float # candidate - reference
+    mean_diff_ci: tuple[float, float]
+    var_ratio_ci: tuple[float, float] # candidate / reference, bootstrapped
+    passed: bool
+
+class ENConfigValidation(NamedTuple):
+    params: ENParams
+    reference_time: float # Seconds to run all of the config's sims
+    candidate_time: float
+    passed: bool
+    bit_exact_mismatches: Optional[int] = None
+    # Number of sims whose results were not identical. Only in bit-exact mode
+    field_comparisons: Optional[List[ENFieldComparison]] = None
+    # Only in distribution mode
+
+class ENValidationSummary(NamedTuple):
+    engine: str
+    mode: str # 'bit-exact' or 'distribution'
+    sim_count: int
+    configs: List[ENConfigValidation]
+    passed: bool
+    speedup: float # Total reference time / total candidate time
+
+## Statistics
+def ks_two_sample(x: np.ndarray, y: np.ndarray) -> tuple[float, float]:
+    """ Two-sample Kolmogorov-Smirnov statistic with its asymptotic p-value. The p-value is
+    conservative when there are ties (e.g. rounded or discrete results). """
+    pooled = np.sort(np.concatenate([x, y]))
+    cdf_x = np.searchsorted(np.sort(x), pooled, side='right') / len(x)
+    cdf_y = np.searchsorted(np.sort(y), pooled, side='right') / len(y)
+    d = float(np.max(np.abs(cdf_x - cdf_y)))
+    en = np.sqrt(len(x) * len(y) / (len(x) + len(y)))
+    lam = (en + 0.12 + 0.11 / en) * d
+    if lam < 1e-3:
+        return d, 1.0
+    j = np.arange(1, 101)
+    p = 2 * np.sum((-1) ** (j - 1) * np.exp(-2 * j ** 2 * lam ** 2))
+    return d, float(np.clip(p, 0, 1))
+
+def ad_two_sample(x: np.ndarray,
+                  y: np.ndarray,
+                  rng: np.random.Generator,
+                  permutations: int = 1000) -> tuple[float, float]:
+    """ Two-sample Anderson-Darling statistic (in the form that allows for ties, Scholz and
+    Stephens 1987), with a permutation p-value. Permutations are drawn in chunks of
+    BOOTSTRAP_CHUNK_SIZE to bound memory. """
+    pooled = np.concatenate([x, y])
+    order = np.argsort(pooled, kind='stable')
+    sorted_pooled = pooled[order]
+    N, m = len(pooled), len(x)
+    # Evaluate at the last position of each distinct value, except the largest
+    boundaries = np.flatnonzero(np.diff(sorted_pooled) != 0)
+    if len(boundaries) == 0:
+        return 0.0, 1.0 # All values identical
+    B = boundaries + 1 # Number of pooled values <= each distinct value
+    l = np.diff(np.concatenate([[0], B])) # Multiplicity of each distinct value
+
+    def statistic(labels: np.ndarray) -> np.ndarray:
+        M = np.cumsum(labels, axis=-1)[..., boundaries]
+        return np.sum(l * (M * N - m * B) ** 2 / (B * (N - B)), axis=-1) / (m * (N - m))
+
+    labels = np.zeros(N)
+    labels[:m] = 1
+    observed = float(statistic(labels[order]))
+    exceedances = 0
+    for start in range(0, permutations, BOOTSTRAP_CHUNK_SIZE):
+        size = min(BOOTSTRAP_CHUNK_SIZE, permutations - start)
+        permuted = np.array([rng.permutation(labels) for _ in range(size)])
+        exceedances += int(np.sum(statistic(permuted) >= observed - 1e-12))
+    p = (1 + exceedances) / (1 + permutations)
+    return observed, float(p)
+
+def mean_diff_ci(x: np.ndarray, y: np.ndarray, alpha: float) -> tuple[float, tuple[float, float]]:
+    """ Difference in means (x - y) with a normal-approximation (Welch) confidence interval. """
+    diff = float(np.mean(x) - np.mean(y))
+    se = np.sqrt(np.var(x, ddof=1) / len(x) + np.var(y, ddof=1) / len(y))
+    z = NormalDist().inv_cdf(1 - alpha / 2)
+    return diff, (diff - z * se, diff + z * se)
+
+def var_ratio_ci(x: np.ndarray,
+                 y: np.ndarray,
+                 alpha: float,
+                 rng: np.random.Generator,
+                 resamples: Optional[int] = None) -> tuple[float, float]:
+    """ Percentile bootstrap confidence interval for var(x) / var(y). By default, there are
+    enough resamples that BOOTSTRAP_TAIL_RESAMPLES fall beyond each end of the interval, so
+    that small (e.g. Bonferroni corrected) alphas are not clipped to the bootstrap extremes. """
+    if resamples is None:
+        resamples = max(1000, int(np.ceil(2 * BOOTSTRAP_TAIL_RESAMPLES / alpha)))
+    chunks: List[np.ndarray] = []
+    for start in range(0, resamples, BOOTSTRAP_CHUNK_SIZE):
+        size = min(BOOTSTRAP_CHUNK_SIZE, resamples - start)
+        bx = x[rng.integers(len(x), size=(size, len(x)))]
+        by = y[rng.integers(len(y), size=(size, len(y)))]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            chunks.append(np.var(bx, axis=1, ddof=1) / np.var(by, axis=1, ddof=1))
+    ratios = np.concatenate(chunks)
+    ratios = ratios[~np.isnan(ratios)] # 0/0: both resamples constant
+    if len(ratios) == 0:
+        return (1.0, 1.0)
+    # Without interpolation, so that infinite ratios (constant y resamples) give an
+    # unbounded interval rather than NaN
+    low, high = np.quantile(ratios, [alpha / 2, 1 - alpha / 2], method='inverted_cdf')
+    return float(low), float(high)
+
+## Validation
+class ENEngineValidator():
+    """ Checks an alternative sim engine against the reference ENSimulation/ENetwork/Scientist
+    implementation, over a matrix of configs.
+
+    bit_exact: both engines get the same rng seeds and must give identical results. For
+    engines that should be exact optimizations of the reference.
+    distribution: the engines get independent seeds, and each ENSingleSimResults field must
+    pass KS and Anderson-Darling tests and confidence interval checks on the mean and the
+    variance. For engines that draw their randomness differently or approximate the reference.
+    The significance level is Bonferroni corrected across all the checks in the matrix.
+
+    E.g. print_validation_summary(ENEngineValidator(random_tape_engine, 'random tape').distribution(200)) """
+    def __init__(self,
+                 candidate: ENEngine,
+                 name: str,
+                 configs: List[ENParams] = REPRESENTATIVE_CONFIGS,
+                 reference: ENEngine = reference_engine,
+                 seed: int = 253):
+        self.candidate = candidate
+        self.name = name
+        self.configs = configs
+        self.reference = reference
+        self.seed = seed
+
+    ## Interface
+    def bit_exact(self, sim_count: int) -> ENValidationSummary:
+        config_validations: List[ENConfigValidation] = []
+        for i, params in enumerate(self.configs):
+            seeds = np.random.SeedSequence([self.seed, i]).spawn(sim_count)
+            reference_results, reference_time = self._run(self.reference, params, seeds)
+            candidate_results, candidate_time = self._run(self.candidate, params, seeds)
+            mismatches = sum(r != c for r, c in zip(reference_results, candidate_results))
+            config_validations.append(ENConfigValidation(
+                params, reference_time, candidate_time, mismatches == 0, bit_exact_mismatches=mismatches))
+        return self._report('bit-exact', sim_count, config_validations)
+
+    def distribution(self, sim_count: int, alpha: float = 0.05) -> ENValidationSummary:
+        if sim_count < 2:
+            raise ValueError("Distribution tests need at least two sims per config")
+        check_count = 4 * len(ENSingleSimResults._fields) * len(self.configs)
+        corrected_alpha = alpha / check_count
+        stats_rng = np.random.default_rng(self.seed)
+        config_validations: List[ENConfigValidation] = []
+        for i, params in enumerate(self.configs):
+            reference_seeds, candidate_seeds = np.random.SeedSequence([self.seed, i]).spawn(2)
+            reference_results, reference_time = self._run(self.reference, params, reference_seeds.spawn(sim_count))
+            candidate_results, candidate_time = self._run(self.candidate, params, candidate_seeds.spawn(sim_count))
+            comparisons = [self._compare_field(field, reference_results, candidate_results,
+                                               corrected_alpha, stats_rng)
+                           for field in ENSingleSimResults._fields]
+            field_comparisons = [c for c in comparisons if c is not None]
+            config_validations.append(ENConfigValidation(
+                params, reference_time, candidate_time,
+                all(c.passed for c in field_comparisons), field_comparisons=field_comparisons))
+        return self._report('distribution', sim_count, config_validations)
+
+    ## Private methods
+    def _run(self,
+             engine: ENEngine,
+             params: ENParams,
+             seeds: List[np.random.SeedSequence]) -> tuple[List[Optional[ENSingleSimResults]], float]:
+        start_time = timeit.default_timer()
+        results = [engine(np.random.default_rng(s), params) for s in seeds]
+        return results, timeit.default_timer() - start_time
+
+    def _compare_field(self,
+                       field: str,
+                       reference_results: List[Optional[ENSingleSimResults]],
+                       candidate_results: List[Optional[ENSingleSimResults]],
+                       alpha: float,
+                       rng: np.random.Generator) -> Optional[ENFieldComparison]:
+        x = self._field_values(field, candidate_results)
+        y = self._field_values(field, reference_results)
+        if len(x) < 2 or len(y) < 2:
+            return None # Field not measured for this config, e.g. non-skeptic brier ratio without skeptics
+        ks_statistic, ks_p = ks_two_sample(x, y)
+        # Enough permutations that the smallest attainable p-value is below alpha
+        permutations = max(1000, int(np.ceil(2 / alpha)))
+        ad_statistic, ad_p = ad_two_sample(x, y, rng, permutations)
+        mean_diff, mean_ci = mean_diff_ci(x, y, alpha)
+        var_ci = var_ratio_ci(x, y, alpha, rng)
+        passed = (ks_p >= alpha and ad_p >= alpha
+                  and mean_ci[0] <= 0 <= mean_ci[1]
+                  and var_ci[0] <= 1 <= var_ci[1])
+        return ENFieldComparison(field, ks_statistic, ks_p, ad_statistic, ad_p,
+                                 mean_diff, mean_ci, var_ci, passed)
+
+    def _field_values(self, field: str, results: List[Optional[ENSingleSimResults]]) -> np.ndarray:
+        return np.array([getattr(r, field) for r in results
+                         if r is not None and getattr(r, field) is not None], dtype=float)
+
+    def _report(self, mode: str, sim_count: int, configs: List[ENConfigValidation]) -> ENValidationSummary:
+        reference_time = sum(c.reference_time for c in configs)
+        candidate_time = sum(c.candidate_time for c in configs)
+        return ENValidationSummary(
+            engine=self.name,
+            mode=mode,
+            sim_count=sim_count,
+            configs=configs,
+            passed=all(c.passed for c in configs),
+            speedup=reference_time / candidate_time if candidate_time > 0 else float('inf'))
+
+def print_validation_summary(s: ENValidationSummary):
+    print(f'Engine: {s.engine} ({s.mode}, {s.sim_count} sims per config)')
+    for c in s.configs:
+        p = c.params
+        label = (f'pop={p.pop_size} e={p.epsilon} m={p.m} skeptics={p.skeptic_count} '
+                 f'alternator={p.alternator} propagandist={p.propagandist} '
+                 f'rounds_to_new_agent={p.rounds_to_new_agent}')
+        speedup = c.reference_time / c.candidate_time if c.candidate_time > 0 else float('inf')
+        print(f"  {'PASS' if c.passed else 'FAIL'} {label} speedup {round(speedup, 2)}x")
+        if c.bit_exact_mismatches:
+            print(f'    {c.bit_exact_mismatches}/{s.sim_count} sims differ')
+        for f in c.field_comparisons or []:
+            if not f.passed:
+                print(f'    {f.field}: KS p={f.ks_p:.3g}, AD p={f.ad_p:.3g}, '
+                      f'mean diff {f.mean_diff:.3g} CI ({f.mean_diff_ci[0]:.3g}, {f.mean_diff_ci[1]:.3g}), '
+                      f'var ratio CI ({f.var_ratio_ci[0]:.3g}, {f.var_ratio_ci[1]:.3g})')
+    print(f"{'PASS' if s.passed else 'FAIL'}: {sum(c.passed for c in s.configs)}/{len(s.configs)} configs, "
+          f'overall speedup {round(s.speedup, 2)}x')
+    print()
@@ -0,0 +1,54 @@
+import unittest
+import numpy as np
+
+from sim.simsetup import *
+from sim.validation import *
+
+TEST_SIM_COUNT = 4
+TEST_MAX_ROUNDS = 60
+
+TEST_CONFIGS = [
+    ENParams(pop_size=6, epsilon=0.1, m=1.5, max_rounds=TEST_MAX_ROUNDS),
+    ENParams(pop_size=8, epsilon=0.05, m=1, max_rounds=TEST_MAX_ROUNDS, skeptic_count=1, alternator=True),
+    ENParams(pop_size=6, epsilon=0.1, m=2, max_rounds=TEST_MAX_ROUNDS, propagandist=True,
+             rounds_to_new_agent=5),
+]
+
+def rng_streams(config_index: int) -> List[np.random.Generator]:
+    return [np.random.default_rng(s) for s in np.random.SeedSequence(253 + config_index).spawn(TEST_SIM_COUNT)]
+
+class TestExecutorEquivalence(unittest.TestCase):
+    """ All executors should give identical summaries for the same rng streams. """
+    def test_executors_give_identical_summaries(self):
+        for i, params in enumerate(TEST_CONFIGS):
+            summaries = {executor_type: ENSimSetup(TEST_SIM_COUNT, None, executor_type, worker_count=2)
+                         .run_sims_for_param_config(params, rng_streams(i))
+                         for executor_type in ExecutorType}
+            for executor_type, summary in summaries.items():
+                with self.subTest(params=params, executor_type=executor_type):
+                    self.assertEqual(summary, summaries[ExecutorType.SERIAL])
+
+    def test_unknown_executor_type(self):
+        with self.assertRaises(ValueError):
+            make_executor('gpu') # type: ignore
+
+class TestBitExactEngines(unittest.TestCase):
+    """ Engines that are exact optimizations of a reference must reproduce it sim for sim. """
+    configs = [params._replace(max_rounds=TEST_MAX_ROUNDS) for params in REPRESENTATIVE_CONFIGS]
+
+    def assert_bit_exact(self, summary: ENValidationSummary):
+        for c in summary.configs:
+            with self.subTest(engine=summary.engine, params=c.params):
+                self.assertEqual(c.bit_exact_mismatches, 0)
+
+    def test_reporter_index(self):
+        validator = ENEngineValidator(reporter_index_engine, 'reporter index', self.configs)
+        self.assert_bit_exact(validator.bit_exact(TEST_SIM_COUNT))
+
+    def test_synchronous_matrix(self):
+        validator = ENEngineValidator(synchronous_engine, 'synchronous', self.configs,
+                                      reference=synchronous_reference_engine)
+        self.assert_bit_exact(validator.bit_exact(TEST_SIM_COUNT))
+
+if __name__ == '__main__':
+    unittest.main()